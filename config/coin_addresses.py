@@ -13,67 +13,54 @@ COIN_ADDRESS_MAP_1 = {
     "coins": {
         "ACT/WETH": {
             "pool_address": "0x269BDA0512de57Cd0BE0270686ffb3964C05e19b",
-            "token_is_token0": 0,
             "alt_token_address": "0xE198a5f4c784A5A97f28B2B790603c2B3dfa85C1"
         },
         "FROC/WETH": {
             "pool_address": "0x74F8A8c18010659A456C8584e625996AB62c1B62",
-            "token_is_token0": 0,
             "alt_token_address": "0x3C8cd0dB9a01EfA063a7760267b822A129bc7DCA"
         },
         "TOKEN/USDC": {
             "pool_address": "0x2ff525c71cb7B29fcdE4bEa8C8f601b1dD22480a",
-            "token_is_token0": 0,
             "alt_token_address": "0xD758916365B361Cf833BB9c4c465ECd501dDd984"
         },
         "CLUSTR/WETH": {
             "pool_address": "0xB3fB7cCF7b681E9562C6DA467db4859A8Ef0B8de",
-            "token_is_token0": 0,
             "alt_token_address": "0x4b361e60CF256b926bA15f157D69cAc9cD037426"
         },
         "MEME.ssi/USDC": {
             "pool_address": "0x43F34A518e20B9454C94bf4026EC9024eD84a062",
-            "token_is_token0": 0,
             "alt_token_address": "0xdd3acDBDc7b358Df453a6CB6bCA56C92aA5743aA"
         },
         "DEFI.ssi/USDC": {
             "pool_address": "0xa23fAb21d0653C231166B31Cb6274ff45eBA2eE5",
-            "token_is_token0": 0,
             "alt_token_address": "0x164ffdaE2fe3891714bc2968f1875ca4fA1079D0"
         },
         "MAG7.ssi/USDC": {
             "pool_address": "0xD364eb55E17700b54bd75fEB3F14582eD7A29444",
-            "token_is_token0": 0,
             "alt_token_address": "0x9E6A46f294bB67c20F1D1E7AfB0bBEf614403B55"
         },
         "Fartcoin/WETH": {
             "pool_address": "0xFdbAf04326AcC24e3d1788333826b71E3291863a",
-            "token_is_token0": 0,
             "alt_token_address": "0x2f6c17fa9f9bC3600346ab4e48C0701e1d5962AE"
         },
         "ORA/WETH": {
             "pool_address": "0x316F12517630903035A0E0B4D6E617593EE432ba",
-            "token_is_token0": 0,
             "alt_token_address": "0x333333C465a19C85f85c6CfbED7B16b0B26E3333"
         },
         "BNKR/WETH": {
             "pool_address": "0xAEC085E5A5CE8d96A7bDd3eB3A62445d4f6CE703",
-            "token_is_token0": 0,
             "alt_token_address": "0x22aF33FE49fD1Fa80c7149773dDe5890D3c76F3b"
         },
         "REI/WETH": {
             "pool_address": "0xA213C82265cd3D94f972f735A4f5130e34dF81Bc",
-            "token_is_token0": 0,
             "alt_token_address": "0x6B2504A03ca4D43d0D73776F6aD46dAb2F2a4cFD"
         },
         "AIXBT/USDC": {
             "pool_address": "0xf1Fdc83c3A336bdbDC9fB06e318B08EadDC82FF4",
-            "token_is_token0": 0,
             "alt_token_address": "0x4F9Fd6Be4a90f2620860d680c0d4d5Fb53d1A825"
         },
         "CLANKER/WETH": {
             "pool_address": "0xC1a6FBeDAe68E1472DbB91FE29B51F7a0Bd44F97",
-            "token_is_token0": 0,
             "alt_token_address": "0x1bc0c42215582d5A085795f4baDbaC3ff36d1Bcb"
         }
     }
@@ -1,10 +1,33 @@
 
+import os
 from .settings_private import ALCHEMY_API_KEY
 
 ALCHEMY_URL = f"https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
 HEADERS = {"Content-Type": "application/json"}
 BLOCKS_PER_HOUR = 1800    # approximate for Base (adjust if needed)
 NUM_HOURS       = 5       # how many hourly chunks to want?
+MAX_CONNECTIONS = 32      # size of the shared keep-alive connection pool
+RPC_KEEPALIVE_TIMEOUT = 30  # seconds an idle pooled connection is kept open for reuse
+DNS_CACHE_TTL   = 300     # seconds the RPC host's DNS answer is cached
+RPC_CONNECT_TIMEOUT = 5   # seconds to establish a connection to the RPC endpoint
+RPC_READ_TIMEOUT = 30     # seconds to wait on a silent connection before abandoning the request
+RPC_RETRIES     = 3       # retries for timeouts, dropped connections, HTTP 429/5xx
+RPC_BACKOFF     = 0.5     # first retry delay in seconds; doubles on each retry
+RPC_CALLS_PER_SECOND = None  # JSON-RPC calls/sec budget (a batch counts each call); None = unlimited
+MAX_CONCURRENT_POOLS = 8  # how many pools are fetched at the same time (decoding overlaps)
+LATEST_BLOCK_TTL = 10     # seconds a fetched latest/finalized block number is reused
+LOGS_CACHE_BUCKET_BLOCKS = 1800  # block-aligned bucket size in which finalized logs are cached on disk
+LOGS_CACHE_MAX_BUCKETS = 512     # cached buckets kept on disk below the current window (oldest pruned first)
+OUTPUT_FORMAT   = "csv"   # per-pair output file: "csv" or "parquet" (zstd, needs pyarrow)
+MAX_LOGS_PER_BATCH = 10   # eth_getLogs calls per JSON-RPC batch POST (providers cap this)
+MAX_LOG_BLOCK_RANGE = None  # provider cap on eth_getLogs block span; None = learn it from errors
+
+# Pool token ordering (alt token is token0?) never changes, so it is cached here across runs
+TOKEN_ORDER_CACHE_FILE = os.path.join(os.path.dirname(__file__), "token_order_cache.json")
+
+# Logs of finalized block ranges never change, so they are cached here across runs (None disables)
+LOGS_CACHE_FILE = os.path.join(os.path.dirname(__file__), "logs_cache.sqlite")
 
 # Uniswap V3 "Swap" event signature (Keccak-256 of Swap(...) )
+# Lowercase hex, as nodes return it (an all-upper-case hex topic is accepted too)
 SWAP_TOPIC = "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67"
@@ -0,0 +1 @@
+ALCHEMY_API_KEY = "test"
@@ -0,0 +1,147 @@
+import csv
+from itertools import repeat
+import numpy as np
+import pandas as pd
+
+# Column order of the per-pair output files
+SWAP_FIELDS = ["tx_hash", "amount0", "amount1", "price", "trade_type", "hour_index"]
+
+# trade_type categories, in code order (0 = "buy", 1 = "sell")
+TRADE_TYPES = ["buy", "sell"]
+_TRADE_TYPE_LABELS = np.array(TRADE_TYPES, dtype=object)
+
+# Compact dtypes for the columns in SWAP_FIELDS when loaded for analysis.
+# Left to inference, amount0/amount1 load as Python-int objects (int256 overflows
+# int64) and trade_type/tx_hash as generic strings.
+SWAP_DTYPES = {
+    "tx_hash": "string",
+    "amount0": "float64",
+    "amount1": "float64",
+    "price": "float64",
+    "trade_type": pd.CategoricalDtype(TRADE_TYPES),
+    "hour_index": "int16"
+}
+
+class SwapFileWriter:
+    """
+    Streams decoded swap rows to a per-pair output file, one batch (hour) at a time.
+
+    Supported formats:
+        - "csv":     '<stem>.csv', plain text, exact values; the default.
+        - "parquet": '<stem>.parquet', columnar and zstd-compressed, one row group per
+                     batch. Several times smaller than CSV and much faster to load
+                     back. amount0/amount1 are stored as decimal strings, since int256
+                     does not fit any Parquet integer type; trade_type is a dictionary
+                     (categorical) column of int8 codes. Requires pyarrow.
+
+    Use as a context manager:
+        with SwapFileWriter("ACT-WETH_swap_data", "csv") as writer:
+            writer.write_columns(process_swap_logs_batch(logs, alt_token_is_token0), hour_index)
+    """
+    def __init__(self, stem: str, output_format: str = "csv"):
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown output format {output_format!r}; expected 'csv' or 'parquet'")
+        self.output_format = output_format
+        self.path = f"{stem}.{output_format}"
+        self._file = None
+        self._csv_writer = None
+        self._parquet_writer = None
+
+    def __enter__(self) -> "SwapFileWriter":
+        if self.output_format == "csv":
+            self._file = open(self.path, "w", newline="")
+            self._csv_writer = csv.writer(self._file, lineterminator="\n")
+            self._csv_writer.writerow(SWAP_FIELDS)
+        else:
+            # pyarrow is only needed for parquet output, so it is imported on demand
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self._schema = pa.schema([
+                ("tx_hash", pa.string()),
+                ("amount0", pa.string()),
+                ("amount1", pa.string()),
+                ("price", pa.float64()),
+                ("trade_type", pa.dictionary(pa.int8(), pa.string())),
+                ("hour_index", pa.int16())
+            ])
+            self._parquet_writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        return self
+
+    def write_columns(self, columns: dict, hour_index: int) -> None:
+        """
+        Appends one batch of swaps, given column-wise as returned by
+        process_swap_logs_batch, tagging every row with hour_index.
+        """
+        n = len(columns["tx_hash"])
+        if n == 0:
+            return
+        # index into TRADE_TYPES: 0 = buy, 1 = sell
+        trade_type_codes = (~columns["is_buy"]).view(np.int8)
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(zip(
+                columns["tx_hash"], columns["amount0"], columns["amount1"],
+                columns["price"].tolist(), _TRADE_TYPE_LABELS[trade_type_codes].tolist(), repeat(hour_index, n)
+            ))
+        else:
+            pa = self._pa
+            table = pa.table({
+                "tx_hash": columns["tx_hash"],
+                "amount0": [str(amount) for amount in columns["amount0"]],
+                "amount1": [str(amount) for amount in columns["amount1"]],
+                "price": columns["price"],
+                "trade_type": pa.DictionaryArray.from_arrays(trade_type_codes, TRADE_TYPES),
+                "hour_index": np.full(n, hour_index, dtype=np.int16)
+            }, schema=self._schema)
+            self._parquet_writer.write_table(table)
+
+    def __exit__(self, *exc_info) -> None:
+        if self._file is not None:
+            self._file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+def load_swap_data(path: str) -> pd.DataFrame:
+    """
+    Loads a per-pair swap file written by transaction_screener into a DataFrame with tight dtypes.
+
+    The collector streams exact values to disk; this is the entry point for analysis
+    code that wants them as a DataFrame. Explicit dtypes roughly halve the frame's
+    memory compared to pandas' inference and make group-bys on trade_type and
+    hour_index faster:
+        - amount0 / amount1: float64 raw token units. Exact int256 values are kept in
+          the file; float64's ~15 significant digits are plenty for trade-size analytics.
+        - trade_type: categorical ("buy", "sell"). Any other or missing label is
+          rejected rather than loaded as NaN.
+        - hour_index: int16.
+        - tx_hash: pandas string dtype.
+
+    Parameters:
+        path (str): Path to a "<PAIR>_swap_data.csv" or "<PAIR>_swap_data.parquet" file.
+
+    Returns:
+        pd.DataFrame: One row per swap with the columns in SWAP_DTYPES.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If a column cannot be converted to its dtype, or trade_type holds
+                    a label other than "buy" / "sell" (or none).
+    """
+    # trade_type is first read with whatever labels the file has, so unknown ones can
+    # be reported instead of turning into NaN under the fixed categories
+    dtypes = {**SWAP_DTYPES, "trade_type": "category"}
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path).astype(dtypes)
+    else:
+        # round_trip parsing gives the same floats as the values written (and as parquet)
+        df = pd.read_csv(path, dtype=dtypes, float_precision="round_trip")
+
+    trade_types = df["trade_type"]
+    unknown = trade_types.cat.categories.difference(TRADE_TYPES)
+    if len(unknown) or trade_types.isna().any():
+        raise ValueError(
+            f"Unexpected trade_type in {path}: {list(unknown)} "
+            f"({int(trade_types.isna().sum())} missing); expected one of {TRADE_TYPES}"
+        )
+    df["trade_type"] = trade_types.astype(SWAP_DTYPES["trade_type"])
+    return df
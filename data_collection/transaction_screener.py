@@ -1,108 +1,269 @@
-import requests
-import time
-import math
-import pandas as pd
-from eth_abi import abi  
+import os
+import asyncio
+import importlib.util
+import argparse
+from collections import Counter
+import numpy as np
 from config import settings as S
 from config.coin_addresses import COIN_ADDRESS_MAP_1 as C1
 from .utils import (
     get_latest_block,
-    get_logs_in_range,
-    process_swap_log,
-    detect_if_alt_token_is_token0
+    get_finalized_block,
+    get_logs_batch,
+    process_swap_logs_batch,
+    detect_if_alt_token_is_token0,
+    close_session
 )
+from .swap_data import SwapFileWriter
 
-def main() -> None:
+async def fetch_pool(pool_address: str, alt_token_address: str,
+                     hour_ranges: list[tuple[int, int]]) -> tuple[bool, dict[int, list]]:
     """
-    Orchestrates the retrieval, decoding, and basic analysis of Swap events for multiple pools.
+    Fetches everything main() needs for one pool: token ordering and the hourly logs.
 
-    For each token pair listed in C1["coins"], this workflow:
-      1. Determines whether the alt token is token0 or token1 in the Uniswap V3 pool 
-         (detect_if_alt_token_is_token0).
-      2. Fetches logs in hourly chunks (defined by S.NUM_HOURS and S.BLOCKS_PER_HOUR).
-      3. Decodes the logs via process_swap_log, categorizing swaps as "buy" or "sell."
-      4. Aggregates the results into a Pandas DataFrame, computing buy/sell counts and
-         average price per hour.
-      5. Exports the results to a CSV file named after the token pair.
+    The token0/token1 lookup and the batched 'eth_getLogs' request are issued
+    concurrently over the shared keep-alive session. If either fails, the other is
+    cancelled before the error is raised, so a skipped pool leaves nothing running
+    that could use the session or the logs cache after main() closes them.
 
-    Console Output:
-      - Latest block number.
-      - Per-hour log fetch status (start_block, end_block).
-      - Total Swap events found in each chunk and overall.
-      - Buy/Sell breakdown per hour_index.
-      - Average price by hour_index.
-      - Name of the output CSV file.
+    Parameters:
+        pool_address (str):      The Uniswap V3 pool contract address.
+        alt_token_address (str): The alt token address to check against token0/token1.
+        hour_ranges (list[tuple[int, int]]): (start_block, end_block) per hour, newest first.
+
+    Returns:
+        tuple[bool, dict[int, list]]:
+            - Whether the alt token is token0 in the pool.
+            - Raw logs keyed by hour index (0 = most recent hour).
 
     Raises:
-      Exception: If any Alchemy API call fails or returns unexpected data.
-      ValueError: If decoded swap data is malformed (e.g., missing fields).
+        Exception: If any of the underlying Alchemy API calls fail.
+    """
+    log_ranges = [(start_block, end_block, pool_address) for (start_block, end_block) in hour_ranges]
+    tasks = [
+        asyncio.ensure_future(detect_if_alt_token_is_token0(pool_address, alt_token_address)),
+        asyncio.ensure_future(get_logs_batch(log_ranges))
+    ]
+    try:
+        token_is_token0, logs_by_hour = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather leaves the other request running when one fails; stop it and wait
+        # for it to unwind before the error reaches process_pair
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return token_is_token0, logs_by_hour
+
+def get_hour_ranges(latest_block: int) -> list[tuple[int, int]]:
+    """
+    Splits the S.NUM_HOURS hours before latest_block into (start_block, end_block) ranges.
+
+    Parameters:
+        latest_block (int): The chain tip the sweep counts back from.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive block ranges, newest hour first, each
+                               S.BLOCKS_PER_HOUR blocks wide (stops early at block 0).
+    """
+    hour_ranges = []
+    end_block = latest_block
+    for _ in range(S.NUM_HOURS):
+        start_block = max(end_block - S.BLOCKS_PER_HOUR, 0)
+        hour_ranges.append((start_block, end_block))
+
+        # Move range backward
+        end_block = start_block - 1
+        if end_block < 0:
+            break
+    return hour_ranges
+
+def write_pair_swaps(pair_name: str, token_is_token0: bool, logs_by_hour: dict[int, list],
+                     hour_ranges: list[tuple[int, int]], output_format: str = S.OUTPUT_FORMAT) -> str:
+    """
+    Decodes one pair's hourly logs, streams the swaps to its output file, and summarizes them.
+
+    This is the CPU/disk-bound half of process_pair, kept synchronous so it can run in
+    a worker thread while other pools are still waiting on the network.
+
+    Parameters:
+        pair_name (str):         Token pair label, e.g. "ACT/WETH"; also names the output file
+                                 ("<PAIR>_swap_data.csv" or ".parquet", per output_format).
+        token_is_token0 (bool):  Whether the alt token is token0 in the pool.
+        logs_by_hour (dict[int, list]): Raw logs keyed by hour index (0 = most recent hour).
+                                        Consumed: each hour is removed once it is written.
+        hour_ranges (list[tuple[int, int]]): (start_block, end_block) per hour, newest first.
+        output_format (str):     "csv" or "parquet" (see SwapFileWriter); defaults to S.OUTPUT_FORMAT.
+
+    Returns:
+        str: The console report for this pair (per-hour fetch status, buy/sell counts,
+             average price, output file), printed by the caller in one piece so that
+             reports from concurrently processed pairs don't interleave.
+
+    Raises:
+        ValueError: If decoded swap data is malformed (e.g., missing fields).
     """
-    latest_block = get_latest_block()
-    print("Latest block number:", latest_block)
+    report = []
+    buys_by_hour = Counter()
+    sells_by_hour = Counter()
+    price_sum_by_hour = Counter()
+    total_swaps = 0
+
+    # Rows are written as each hour is decoded, so no full table is ever held in memory
+    output_stem = pair_name.replace("/", "-") + "_swap_data"
+    with SwapFileWriter(output_stem, output_format) as writer:
+        for hour_index, (start_block, end_block) in enumerate(hour_ranges):
+            report.append(f"[{pair_name}] Hour {hour_index+1}: blocks {start_block} to {end_block}")
+
+            # pop, so each hour's raw logs are freed as soon as they are decoded
+            # (nothing else references them; get_logs_batch keeps no copy)
+            logs = logs_by_hour.pop(hour_index)
+            report.append(f"  Fetched {len(logs)} logs for {pair_name}")
+
+            # Decode the whole chunk of logs at once, as columns
+            hour_swaps = process_swap_logs_batch(logs, token_is_token0)
+            del logs
+            swap_count = len(hour_swaps["tx_hash"])
+            if swap_count:
+                buys = int(np.count_nonzero(hour_swaps["is_buy"]))
+                buys_by_hour[hour_index + 1] = buys
+                sells_by_hour[hour_index + 1] = swap_count - buys
+                price_sum_by_hour[hour_index + 1] = float(hour_swaps["price"].sum())
+            # Tag with hour index
+            writer.write_columns(hour_swaps, hour_index + 1)
 
-    for pair_name, coin_info in C1["coins"].items():
-        pool_address = coin_info["pool_address"]
+            report.append(f"  Found {swap_count} Swap events in this chunk.")
+            total_swaps += swap_count
 
-        # If config has alt_token_address, you can do:
-        alt_token_address = coin_info["alt_token_address"]
-        # figure out whether alt token in token0
-        token_is_token0 = detect_if_alt_token_is_token0(pool_address, alt_token_address)
+    report.append(f"Total Swap events collected: {total_swaps}")
 
-        end_block = latest_block
-        all_swaps = []  # store dicts of swap data here
+    if total_swaps == 0:
+        os.remove(writer.path)
+        report.append(f"No swap data for {pair_name}!")
+        return "\n".join(report)
 
-        for hour_index in range(S.NUM_HOURS):
-            start_block = max(end_block - S.BLOCKS_PER_HOUR, 0)
-            print(f"[{pair_name}] Hour {hour_index+1}: blocks {start_block} to {end_block}")
+    # Hours that had at least one swap
+    hours = sorted(buys_by_hour.keys() | sells_by_hour.keys())
 
-            logs = get_logs_in_range(start_block, end_block, pool_address)
-            print(f"  Fetched {len(logs)} logs for {pair_name}")
+    # Show buy/sell counts by hour
+    report.append("\nBuy/Sell counts by hour_index:")
+    report.append(f"{'hour_index':>10} {'buy':>6} {'sell':>6}")
+    for hour in hours:
+        report.append(f"{hour:>10} {buys_by_hour[hour]:>6} {sells_by_hour[hour]:>6}")
 
-            # Parse each log for swap data
-            hour_swaps = []
-            for log in logs:
-                parsed = process_swap_log(log, token_is_token0)
-                if parsed is not None:
-                    # Tag with hour index or block range
-                    parsed["hour_index"] = hour_index + 1
-                    hour_swaps.append(parsed)
+    # Average price by hour
+    report.append("\nAverage price by hour:")
+    for hour in hours:
+        swaps_in_hour = buys_by_hour[hour] + sells_by_hour[hour]
+        report.append(f"{hour:>10} {price_sum_by_hour[hour] / swaps_in_hour:.6g}")
 
-            print(f"  Found {len(hour_swaps)} Swap events in this chunk.")
+    report.append(f"Saved {writer.path} with {total_swaps} swap events.\n")
+    return "\n".join(report)
 
-            all_swaps.extend(hour_swaps)
+async def process_pair(pair_name: str, coin_info: dict, latest_block: int,
+                       pool_slots: asyncio.Semaphore, output_format: str = S.OUTPUT_FORMAT) -> None:
+    """
+    Runs the full pipeline for one token pair: fetch, decode, save to CSV/Parquet, print summary.
+
+    Parameters:
+        pair_name (str):   Token pair label from C1["coins"], e.g. "ACT/WETH".
+        coin_info (dict):  The pair's config entry (pool_address, alt_token_address).
+        latest_block (int): The chain tip shared by every pair in this run.
+        pool_slots (asyncio.Semaphore): Bounds how many pools are fetching at once
+                                        (S.MAX_CONCURRENT_POOLS); held only for the
+                                        fetch, not while decoding.
+        output_format (str): "csv" or "parquet" output file.
+
+    Raises:
+        ValueError: If decoded swap data is malformed. Fetch failures are printed and
+                    the pair is skipped instead.
+    """
+    hour_ranges = get_hour_ranges(latest_block)
+    async with pool_slots:
+        try:
+            token_is_token0, logs_by_hour = await fetch_pool(
+                coin_info["pool_address"], coin_info["alt_token_address"], hour_ranges
+            )
+        except Exception as e:
+            print(f"[{pair_name}] Failed to fetch pool data, skipping: {e}\n")
+            return
 
-            # Move range backward
-            end_block = start_block - 1
-            if end_block < 0:
-                break
+    # Decoding and CSV writing happen off the event loop and after the slot is released,
+    # so the next pool's requests are already in flight while this one decodes
+    report = await asyncio.to_thread(
+        write_pair_swaps, pair_name, token_is_token0, logs_by_hour, hour_ranges, output_format
+    )
+    print(report)
 
-            # brief sleep to avoid spamming
-            time.sleep(0.5)
+async def main(latest_block: int | None = None, output_format: str | None = None) -> None:
+    """
+    Orchestrates the retrieval, decoding, and basic analysis of Swap events for multiple pools.
 
-        print(f"Total Swap events collected: {len(all_swaps)}")
+    Parameters:
+        latest_block (int | None): Block to count the hours back from. Pass it (e.g. via
+                                   --latest-block from a scheduler that already knows
+                                   the tip) to skip the eth_blockNumber call; None
+                                   fetches the current chain tip.
+        output_format (str | None): "csv" or "parquet" (e.g. via --output-format);
+                                    None uses S.OUTPUT_FORMAT.
 
-        # 5. Convert to DataFrame for analysis
-        df = pd.DataFrame(all_swaps)
-        if df.empty:
-            print(f"No swap data for {pair_name}!")
-            continue
+    For each token pair listed in C1["coins"], this workflow (process_pair):
+      1. Determines whether the alt token is token0 or token1 in the Uniswap V3 pool 
+         (detect_if_alt_token_is_token0).
+      2. Fetches logs in hourly chunks (defined by S.NUM_HOURS and S.BLOCKS_PER_HOUR).
+         Each pool's hours are sent as one JSON-RPC batch request (get_logs_batch).
+      3. Decodes the logs via process_swap_logs_batch, categorizing swaps as "buy" or "sell."
+      4. Streams each hour's swaps straight into a CSV (or Parquet, see output_format)
+         file named after the token pair, keeping only running buy/sell counts and
+         price sums per hour in memory.
+      5. Prints buy/sell counts and average price per hour from those running totals.
+    Pairs are independent, so up to S.MAX_CONCURRENT_POOLS of them fetch at once over a
+    shared keep-alive session. Decoding runs in worker threads outside that limit,
+    so it overlaps with the next pools' network requests.
 
-        # 6. Show buy/sell counts by hour
-        grouped = df.groupby(["hour_index", "trade_type"]).size().unstack(fill_value=0)
-        print("\nBuy/Sell counts by hour_index:")
-        print(grouped)
+    Console Output:
+      - Latest block number.
+      - Per pair, printed as one block when that pair finishes:
+        - Per-hour log fetch status (start_block, end_block).
+        - Total Swap events found in each chunk and overall.
+        - Buy/Sell breakdown per hour_index.
+        - Average price by hour_index.
+        - Name of the output file.
 
-        # 7. Average price by hour
-        avg_price = df.groupby("hour_index")["price"].mean()
-        print("\nAverage price by hour:")
-        print(avg_price)
+    Raises:
+      ImportError: If Parquet output is requested but pyarrow is not installed
+                   (checked before any RPC is made).
+      Exception: If the latest or finalized block cannot be fetched. Failures while
+                 fetching an individual pool are printed and that pool is skipped.
+      ValueError: If decoded swap data is malformed (e.g., missing fields).
+    """
+    output_format = output_format or S.OUTPUT_FORMAT
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        # optional dependency; fail now rather than after every pool is fetched
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow), or use --output-format csv")
 
-        # 8. Save to CSV
-        csv_filename = pair_name.replace("/", "-") + "_swap_data.csv"
-        df.to_csv(csv_filename, index=False)
-        print(f"Saved {csv_filename} with {len(df)} swap events.\n")
+    try:
+        if latest_block is None:
+            latest_block = await get_latest_block()
+        print("Latest block number:", latest_block)
+        if S.LOGS_CACHE_FILE:
+            # Bounds what the logs cache may store; asked once here so the pools that
+            # start together share one answer instead of each asking
+            await get_finalized_block()
 
-        #return # only do first in loop for now
+        pool_slots = asyncio.Semaphore(S.MAX_CONCURRENT_POOLS)
+        await asyncio.gather(*(
+            process_pair(pair_name, coin_info, latest_block, pool_slots, output_format)
+            for pair_name, coin_info in C1["coins"].items()
+        ))
+    finally:
+        await close_session()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Collect Uniswap V3 swaps for the pools in COIN_ADDRESS_MAP_1.")
+    parser.add_argument("--latest-block", type=int, default=None,
+                        help="block to count hours back from (default: current chain tip)")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], default=None,
+                        help=f"per-pair output file format (default: {S.OUTPUT_FORMAT}, from settings)")
+    args = parser.parse_args()
+    asyncio.run(main(args.latest_block, args.output_format))
@@ -1,8 +1,223 @@
-import requests
-from eth_abi import abi
+import os
+import re
+import time
+import asyncio
+import binascii
+import hashlib
+import sqlite3
+from urllib.parse import urlsplit
+import aiohttp
+import orjson
+import numpy as np
 from config import settings as S
 
-def get_latest_block() -> int:
+# Shared HTTP session, created lazily inside the running event loop (see get_session)
+_SESSION: aiohttp.ClientSession | None = None
+
+# Token bucket metering JSON-RPC calls per second, created with the session (see get_rate_limiter)
+_RATE_LIMITER: "RateLimiter | None" = None
+
+# Substrings of provider errors meaning "this eth_getLogs range is too big, split it"
+_RANGE_ERROR_MARKERS = ("block range", "response size", "query returned more than")
+# Alchemy's hint, e.g. "... this block range should work: [0x1a2b3c, 0x1a2d00]"
+_SUGGESTED_RANGE_RE = re.compile(r"\[\s*(0x[0-9a-fA-F]+)\s*,\s*(0x[0-9a-fA-F]+)\s*\]")
+# Largest eth_getLogs block span known to work, per pool address (learned from errors)
+_MAX_RANGE_HINTS: dict[str, int] = {}
+# "pool:alt_token" -> alt token is token0; loaded from S.TOKEN_ORDER_CACHE_FILE on first use
+_TOKEN_ORDER_CACHE: dict[str, bool] | None = None
+# pool address -> (token0, token1); immutable for a deployed pool, so never expires
+_POOL_TOKENS: dict[str, tuple[str, str]] = {}
+# Open connection to S.LOGS_CACHE_FILE, the on-disk store of finalized log buckets (see _get_logs_db)
+_LOGS_DB: sqlite3.Connection | None = None
+# (block_number, time.monotonic() when fetched) of the last eth_blockNumber answer
+_LATEST_BLOCK: tuple[int, float] | None = None
+# (block_number or None, time.monotonic() when fetched) of the last "finalized" block answer
+_FINALIZED_BLOCK: tuple[int | None, float] | None = None
+# Accepted spellings of the Swap topic0; a set lookup tolerates a provider returning
+# upper-case hex without case-folding every log
+_SWAP_TOPIC0 = frozenset({S.SWAP_TOPIC, S.SWAP_TOPIC.lower(), "0x" + S.SWAP_TOPIC[2:].upper()})
+# trade_type indexed by "the alt token amount is positive" (False = sell, True = buy)
+_BUY_SELL = ("sell", "buy")
+# Q64.96 scale factor: sqrtPriceX96 * _INV_2_96 is the plain sqrt(price). A power of two,
+# so the multiply is exact in float64
+_INV_2_96 = 2.0 ** -96
+# 'topics' filter for eth_getLogs, built once in the canonical lowercase form
+_SWAP_TOPICS_FILTER = [S.SWAP_TOPIC.lower()]
+
+class RPCError(Exception):
+    """
+    Raised when a JSON-RPC response carries an 'error' object instead of a 'result'.
+
+    Attributes:
+        code (int | None): The JSON-RPC error code, if provided.
+        message (str):     The provider's error message.
+    """
+    def __init__(self, error: dict, context: str = "RPC call"):
+        self.code = error.get("code")
+        self.message = error.get("message", "")
+        super().__init__(f"Error in {context}: {error}")
+
+class RateLimiter:
+    """
+    Async token bucket: allows 'rate' JSON-RPC calls per second on average, with
+    bursts of up to 'capacity' calls.
+
+    Calls only wait when the bucket is empty, i.e. when the configured budget would
+    otherwise be exceeded; below the limit requests go out immediately. Waiters are
+    served in arrival order.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, calls: int = 1) -> None:
+        """
+        Takes 'calls' tokens, sleeping until the bucket has refilled enough to cover them.
+        A batch larger than the bucket is let through once the debt it leaves is paid off.
+        """
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= calls
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+def get_rate_limiter() -> RateLimiter | None:
+    """
+    Returns the rate limiter shared by every JSON-RPC call, or None when
+    S.RPC_CALLS_PER_SECOND is not set. Like the session, it is created on first use
+    inside the running event loop and discarded by close_session().
+    """
+    global _RATE_LIMITER
+    if S.RPC_CALLS_PER_SECOND and _RATE_LIMITER is None:
+        _RATE_LIMITER = RateLimiter(S.RPC_CALLS_PER_SECOND, S.RPC_CALLS_PER_SECOND)
+    return _RATE_LIMITER
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the module-level aiohttp session used for every JSON-RPC call.
+
+    The session is created on first use (it must be created inside a running event
+    loop) and then reused, so all requests share one connection pool and keep-alive
+    TCP+TLS connections to S.ALCHEMY_URL instead of paying a new handshake per call.
+    Idle connections are kept open for S.RPC_KEEPALIVE_TIMEOUT seconds (aiohttp's
+    default of 15s would drop them between the phases of a slower sweep) and the
+    endpoint's DNS answer is cached for S.DNS_CACHE_TTL seconds.
+    S.HEADERS and the connect/read timeouts (S.RPC_CONNECT_TIMEOUT, S.RPC_READ_TIMEOUT)
+    are set once on the session and apply to every request made through it.
+
+    Returns:
+        aiohttp.ClientSession: The shared, open session.
+    """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        connector = aiohttp.TCPConnector(
+            limit=S.MAX_CONNECTIONS,
+            keepalive_timeout=S.RPC_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=S.DNS_CACHE_TTL
+        )
+        _SESSION = aiohttp.ClientSession(
+            connector=connector,
+            headers=S.HEADERS,
+            timeout=aiohttp.ClientTimeout(sock_connect=S.RPC_CONNECT_TIMEOUT, sock_read=S.RPC_READ_TIMEOUT)
+        )
+    return _SESSION
+
+async def close_session() -> None:
+    """
+    Closes the shared aiohttp session, if one is open, drops the rate limiter and
+    closes the on-disk logs cache. Call once at the end of a run.
+    """
+    global _SESSION, _RATE_LIMITER, _LOGS_DB
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+    _RATE_LIMITER = None
+    if _LOGS_DB is not None:
+        _LOGS_DB.close()
+        _LOGS_DB = None
+
+async def post_rpc(payload: dict | list) -> dict | list:
+    """
+    POSTs a JSON-RPC payload (a single request object or a batch array) to S.ALCHEMY_URL.
+
+    The body is encoded and the response decoded with orjson rather than the stdlib
+    json module; 'eth_getLogs' responses with thousands of logs are the largest
+    payloads in the pipeline, and orjson parses them several times faster.
+
+    If S.RPC_CALLS_PER_SECOND is set, every POST first takes one token per JSON-RPC
+    call it carries (a batch counts as its length) from a shared token bucket, so
+    concurrent requests never exceed the provider's rate limit but don't wait when
+    under it.
+
+    Transient failures (connect/read timeouts, dropped connections, HTTP 429 and 5xx)
+    are retried up to S.RPC_RETRIES times with exponential back-off
+    (S.RPC_BACKOFF, then 2x, 4x, ... seconds), so one wedged connection can't stall
+    or kill a whole sweep. A 429 carrying a Retry-After header waits at least that long.
+
+    Parameters:
+        payload (dict | list): A JSON-RPC 2.0 request object, or a list of them for a batch.
+
+    Returns:
+        dict | list: The decoded JSON response body.
+
+    Raises:
+        Exception: If the HTTP status is not 200 (after retries, for 429/5xx).
+        asyncio.TimeoutError: If the request still times out after all retries.
+        aiohttp.ClientError: If the connection still fails after all retries.
+    """
+    body = orjson.dumps(payload)
+    calls = len(payload) if isinstance(payload, list) else 1
+    rate_limiter = get_rate_limiter()
+    for attempt in range(S.RPC_RETRIES + 1):
+        retry_after = 0.0
+        if rate_limiter is not None:
+            await rate_limiter.acquire(calls)
+        try:
+            async with get_session().post(S.ALCHEMY_URL, data=body) as resp:
+                if resp.status == 200:
+                    return orjson.loads(await resp.read())
+                error = Exception(f"HTTP error {resp.status}: {await resp.text()}")
+                if resp.status != 429 and resp.status < 500:
+                    raise error  # the request itself is wrong; retrying won't help
+                if resp.status == 429:
+                    retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as e:
+            error = e
+
+        if attempt < S.RPC_RETRIES:
+            await asyncio.sleep(max(S.RPC_BACKOFF * 2 ** attempt, retry_after))
+    raise error
+
+def _parse_retry_after(value: str | None) -> float:
+    """
+    Returns the delay in seconds from a Retry-After header given in seconds, or 0 if
+    it is missing or not a number (the HTTP-date form is not used by RPC providers).
+    """
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _swap_logs_filter(from_block: int, to_block: int, address: str) -> dict:
+    """
+    Builds the 'eth_getLogs' filter object for Swap events of one pool over a block range.
+
+    The Swap topic is part of the filter so the node drops Mint/Burn/Collect/etc.
+    logs before sending, instead of shipping them only for process_swap_log to discard.
+    """
+    return {
+        "fromBlock": hex(from_block),
+        "toBlock":   hex(to_block),
+        "address":   address,
+        "topics":    _SWAP_TOPICS_FILTER
+    }
+
+async def get_latest_block() -> int:
     """
     Fetches the latest block number via Alchemy's JSON-RPC API.
 
@@ -10,6 +225,9 @@ def get_latest_block() -> int:
     network (e.g., Ethereum mainnet, Base, etc.) according to the URL specified 
     in S.ALCHEMY_URL. It returns the most recent block's number as an integer.
 
+    The answer is memoized for S.LATEST_BLOCK_TTL seconds, so repeated calls within
+    a run (or from helpers that need the chain tip) don't each cost an RPC.
+
     API Endpoint:
         - POST to S.ALCHEMY_URL using the standard Ethereum JSON-RPC 2.0 format.
         - Method: 'eth_blockNumber'.
@@ -22,31 +240,79 @@ def get_latest_block() -> int:
         ValueError: If the result cannot be converted from hex to an integer.
         Exception: If the request fails or returns an unexpected response structure.
     """
+    global _LATEST_BLOCK
+    if _LATEST_BLOCK is not None and time.monotonic() - _LATEST_BLOCK[1] < S.LATEST_BLOCK_TTL:
+        return _LATEST_BLOCK[0]
+
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
         "method": "eth_blockNumber",
         "params": []
     }
-    resp = requests.post(S.ALCHEMY_URL, headers=S.HEADERS, json=payload)
-    data = resp.json()
+    data = await post_rpc(payload)
     latest_block_hex = data.get("result")
-    return int(latest_block_hex, 16)
+    latest_block = int(latest_block_hex, 16)
+    _LATEST_BLOCK = (latest_block, time.monotonic())
+    return latest_block
+
+async def get_finalized_block() -> int | None:
+    """
+    Fetches the number of the newest finalized block via Alchemy's JSON-RPC API.
+
+    Only logs at or below this block are safe to cache forever. A fixed depth below
+    the tip doesn't work on Base: an L2 block is final only once the batch holding it
+    is finalized on L1, which takes far longer than any small block count, so the
+    node is asked for its "finalized" block instead.
+
+    The answer is memoized for S.LATEST_BLOCK_TTL seconds, like get_latest_block.
+
+    API Endpoint:
+        - POST to S.ALCHEMY_URL using the standard Ethereum JSON-RPC 2.0 format.
+        - Method: 'eth_getBlockByNumber' with params ["finalized", false].
+
+    Returns:
+        int | None: The finalized block number, or None if the node does not support
+                    the "finalized" tag (then nothing counts as finalized).
+
+    Raises:
+        Exception: If the request fails or returns an unexpected response structure.
+    """
+    global _FINALIZED_BLOCK
+    if _FINALIZED_BLOCK is not None and time.monotonic() - _FINALIZED_BLOCK[1] < S.LATEST_BLOCK_TTL:
+        return _FINALIZED_BLOCK[0]
+
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "eth_getBlockByNumber",
+        "params": ["finalized", False]
+    }
+    data = await post_rpc(payload)
+    if "error" in data:
+        finalized_block = None
+    elif data.get("result") is not None:
+        finalized_block = int(data["result"]["number"], 16)
+    else:
+        raise Exception(f"Error in get_finalized_block: {data}")
+    _FINALIZED_BLOCK = (finalized_block, time.monotonic())
+    return finalized_block
 
-def get_logs_in_range(from_block: int, to_block: int, address: str) -> list:
+async def get_logs_in_range(from_block: int, to_block: int, address: str) -> list:
     """
     Retrieves raw transaction logs from a specified block range via Alchemy's 'eth_getLogs'.
 
-    This function queries an EVM-compatible node (e.g., Base or Ethereum) for all
-    event logs emitted by a particular contract address between from_block and 
-    to_block (inclusive). The returned logs can be parsed afterward to detect 
-    swap events or any other specific event signatures.
+    This function queries an EVM-compatible node (e.g., Base or Ethereum) for the
+    Swap event logs emitted by a particular contract address between from_block and 
+    to_block (inclusive). The returned logs can be parsed afterward with
+    process_swap_log.
 
     API Endpoint:
         - POST to S.ALCHEMY_URL with the 'eth_getLogs' method.
         - 'from_block' and 'to_block' are converted to hexadecimal strings.
         - 'address' should be the smart contract from which logs are needed (e.g., a 
           Uniswap V2/V3 pool or another DEX pool).
+        - 'topics' is set to [S.SWAP_TOPIC], so the node only returns Swap events.
 
     Parameters:
         from_block (int): The starting block number (inclusive).
@@ -60,33 +326,353 @@ def get_logs_in_range(from_block: int, to_block: int, address: str) -> list:
     Raises:
         Exception: If the HTTP request fails, or if the response lacks a valid 'result'.
     """
-    from_block_hex = hex(from_block)
-    to_block_hex   = hex(to_block)
-
     payload = {
         "jsonrpc": "2.0",
         "id": 1,
         "method": "eth_getLogs",
-        "params": [
-            {
-                "fromBlock": from_block_hex,
-                "toBlock":   to_block_hex,
-                "address":   address
-            }
-        ]
+        "params": [_swap_logs_filter(from_block, to_block, address)]
     }
 
-    resp = requests.post(S.ALCHEMY_URL, headers=S.HEADERS, json=payload)
-    if resp.status_code != 200:
-        raise Exception(f"HTTP error {resp.status_code}: {resp.text}")
-
-    data = resp.json()
+    data = await post_rpc(payload)
     if "result" in data:
         return data["result"]
+    elif "error" in data:
+        raise RPCError(data["error"], "get_logs_in_range")
     else:
         raise Exception(f"Error in get_logs_in_range: {data}")
 
-def get_token0(pool_address: str) -> str:
+def is_range_error(error: RPCError) -> bool:
+    """
+    Returns True if an RPC error means the requested eth_getLogs range was too large
+    (too many blocks, or a response over the provider's log/size cap).
+    """
+    message = error.message.lower()
+    return any(marker in message for marker in _RANGE_ERROR_MARKERS)
+
+async def get_logs_adaptive(from_block: int, to_block: int, address: str) -> list:
+    """
+    Retrieves logs like 'get_logs_in_range', splitting the block range whenever the provider rejects it as too large.
+
+    Providers cap 'eth_getLogs' by block span and/or number of logs returned (Alchemy:
+    10k logs per response). Rather than hardcoding a safe chunk size, this starts with
+    the full range and backs off only when needed:
+        - If the error text suggests a working range (Alchemy's
+          "this block range should work: [0x.., 0x..]"), split at its end block.
+        - Otherwise bisect the range at its midpoint.
+    The resulting span is remembered per pool as the largest one known to work, and
+    the range is cut into chunks of that size which are fetched concurrently, in
+    JSON-RPC batches ('_fetch_logs_batch'); any chunk that is still too large repeats the
+    process. Later calls for the same pool split up front instead of paying for a
+    rejected round-trip first. S.MAX_LOG_BLOCK_RANGE, if set, is used as the starting
+    hint for every pool.
+
+    Parameters:
+        from_block (int): The starting block number (inclusive).
+        to_block (int):   The ending block number (inclusive).
+        address (str):    The contract address to filter logs by.
+
+    Returns:
+        list: Raw log entries for the whole range, in block order.
+
+    Raises:
+        RPCError: If the provider returns an error that is not about range size, or
+                  still rejects a single-block range.
+        Exception: If the HTTP request fails.
+    """
+    pool_key = address.lower()
+    max_range = _MAX_RANGE_HINTS.get(pool_key, S.MAX_LOG_BLOCK_RANGE)
+
+    if max_range and to_block - from_block + 1 > max_range:
+        # Known to be too big: split into hint-sized chunks without asking first, and
+        # fetch them all at once as JSON-RPC batches
+        chunk_ranges = [
+            (start, min(start + max_range - 1, to_block), address)
+            for start in range(from_block, to_block + 1, max_range)
+        ]
+        chunks = await _fetch_logs_batch(chunk_ranges)
+        return [log for chunk_id in range(len(chunk_ranges)) for log in chunks[chunk_id]]
+
+    try:
+        return await get_logs_in_range(from_block, to_block, address)
+    except RPCError as e:
+        if not is_range_error(e) or from_block >= to_block:
+            raise
+        _record_range_hint(from_block, to_block, address, e)
+
+        # Re-plan the whole range with the new hint: every chunk goes out concurrently
+        return await get_logs_adaptive(from_block, to_block, address)
+
+def _record_range_hint(from_block: int, to_block: int, address: str, error: RPCError) -> None:
+    """
+    Lowers the pool's largest working eth_getLogs span after 'error' rejected the
+    range [from_block, to_block] as too large: to the end of the provider's
+    suggested range if it gives one that starts at from_block, otherwise to half the
+    range. A single-block range can't be split and records nothing.
+    """
+    if from_block >= to_block:
+        return
+    split_block = (from_block + to_block) // 2
+    match = _SUGGESTED_RANGE_RE.search(error.message)
+    if match:
+        suggested_from, suggested_to = (int(x, 16) for x in match.groups())
+        if suggested_from == from_block and from_block <= suggested_to < to_block:
+            split_block = suggested_to
+
+    # Remember the largest span that should work for this pool
+    pool_key = address.lower()
+    working_range = split_block - from_block + 1
+    _MAX_RANGE_HINTS[pool_key] = min(_MAX_RANGE_HINTS.get(pool_key, working_range), working_range)
+
+def _get_logs_db() -> sqlite3.Connection | None:
+    """
+    Returns the connection to the on-disk logs cache (S.LOGS_CACHE_FILE), opening it
+    and creating its table on first use, or None if S.LOGS_CACHE_FILE is not set.
+    """
+    global _LOGS_DB
+    if _LOGS_DB is None and S.LOGS_CACHE_FILE:
+        _LOGS_DB = sqlite3.connect(S.LOGS_CACHE_FILE)
+        with _LOGS_DB:
+            _LOGS_DB.execute(
+                "CREATE TABLE IF NOT EXISTS log_buckets "
+                "(key TEXT PRIMARY KEY, to_block INTEGER NOT NULL, logs BLOB NOT NULL)"
+            )
+            _LOGS_DB.execute("CREATE INDEX IF NOT EXISTS log_buckets_to_block ON log_buckets (to_block)")
+    return _LOGS_DB
+
+def _logs_db_key(key: tuple[str, int, int]) -> str:
+    """
+    Returns the on-disk cache key for an (address, from_block, to_block) bucket: the
+    SHA-256 of the canonical (sorted-key) JSON of the RPC host and the exact
+    'eth_getLogs' filter, so a different network, range, address or topic filter
+    never shares an entry.
+    """
+    address, from_block, to_block = key
+    canonical = orjson.dumps(
+        [urlsplit(S.ALCHEMY_URL).hostname, _swap_logs_filter(from_block, to_block, address)],
+        option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.sha256(canonical).hexdigest()
+
+def _get_cached_logs(db: sqlite3.Connection, key: tuple[str, int, int]) -> list | None:
+    """
+    Returns the cached logs for an (address, from_block, to_block) bucket from the
+    on-disk cache, or None if the bucket was never stored.
+
+    Nothing is kept in memory: a hit is decoded from disk each time, so the caller
+    holds the only reference to the returned list. Only finalized buckets are ever
+    stored, so a stored entry is valid forever and no chain tip is needed to read it.
+    """
+    row = db.execute("SELECT logs FROM log_buckets WHERE key = ?", (_logs_db_key(key),)).fetchone()
+    if row is None:
+        return None
+    return orjson.loads(row[0])
+
+def _cache_logs(db: sqlite3.Connection, entries: list[tuple[tuple[str, int, int], list]],
+                window_start: int) -> None:
+    """
+    Stores the logs of finalized (address, from_block, to_block) buckets on disk, in
+    one transaction, then prunes the buckets that end before window_start (the first
+    block of the current run's window) down to the S.LOGS_CACHE_MAX_BUCKETS with the
+    highest to_block. Rolling windows only move forward, so the oldest blocks are the
+    ones no later run asks for; buckets inside the window are never pruned, however
+    many pools and hours it spans, so a run can't evict what the next run needs.
+    """
+    with db:
+        db.executemany(
+            "INSERT OR REPLACE INTO log_buckets (key, to_block, logs) VALUES (?, ?, ?)",
+            [(_logs_db_key(key), key[2], orjson.dumps(logs)) for key, logs in entries]
+        )
+        db.execute(
+            "DELETE FROM log_buckets WHERE key IN (SELECT key FROM log_buckets "
+            "WHERE to_block < ? ORDER BY to_block DESC LIMIT -1 OFFSET ?)",
+            (window_start, S.LOGS_CACHE_MAX_BUCKETS)
+        )
+
+async def get_logs_batch(ranges: list[tuple[int, int, str]]) -> dict[int, list]:
+    """
+    Retrieves Swap logs for many (from_block, to_block, address) ranges, serving
+    finalized blocks from the on-disk cache and fetching the rest in JSON-RPC batches.
+
+    Hour ranges are anchored to the chain tip, so they shift with every new block and
+    an exact range is never requested twice. The cache is therefore keyed by fixed
+    buckets of S.LOGS_CACHE_BUCKET_BLOCKS blocks (aligned to multiples of that size)
+    instead: each range is cut at bucket boundaries and
+        - a piece whose bucket is stored is sliced out of it (by blockNumber),
+        - a piece whose whole bucket is finalized (at or below the node's
+          "finalized" block, see get_finalized_block) fetches that whole bucket,
+          stores it in S.LOGS_CACHE_FILE and is sliced out of it,
+        - any other piece (not yet finalized, or the node has no "finalized" tag)
+          is fetched as is and never stored, since it can still be reorged.
+    A re-run a few minutes later therefore only fetches the blocks near the tip. All
+    pieces and buckets of all ranges go out together through '_fetch_logs_batch'.
+    With S.LOGS_CACHE_FILE set to None the ranges are fetched directly.
+
+    Parameters:
+        ranges (list[tuple[int, int, str]]): (from_block, to_block, address) tuples,
+                                             with block numbers inclusive.
+
+    Returns:
+        dict[int, list]: Maps each request id (the index into 'ranges') to its list
+                         of raw log entries, in block order.
+
+    Raises:
+        Exception: If the HTTP request fails, the batch itself is rejected, or any
+                   individual request in the batch returns an error.
+    """
+    db = _get_logs_db()
+    if not ranges or db is None:
+        return await _fetch_logs_batch(ranges)
+
+    finalized_block = await get_finalized_block()
+    bucket_size = S.LOGS_CACHE_BUCKET_BLOCKS
+    buckets = {}  # (address, bucket_start, bucket_end) -> cached logs, or None if missing
+    fetches = []  # (from_block, to_block, address) to fetch: missing buckets, then near-tip pieces
+    pieces = []   # per range: (bucket key or index into fetches, from_block, to_block)
+    for from_block, to_block, address in ranges:
+        range_pieces = []
+        start = from_block
+        while start <= to_block:
+            bucket_start = start - start % bucket_size
+            bucket_end = bucket_start + bucket_size - 1
+            end = min(to_block, bucket_end)
+            key = (address.lower(), bucket_start, bucket_end)
+            if key not in buckets:
+                buckets[key] = _get_cached_logs(db, key)
+            finalized = finalized_block is not None and bucket_end <= finalized_block
+            if buckets[key] is not None or finalized:
+                range_pieces.append((key, start, end))
+            elif range_pieces and not isinstance(range_pieces[-1][0], tuple):
+                # follows another near-tip piece: extend that request instead
+                del buckets[key]
+                fetch_id, piece_start, _ = range_pieces[-1]
+                range_pieces[-1] = (fetch_id, piece_start, end)
+                fetches[fetch_id] = (piece_start, end, address)
+            else:
+                del buckets[key]
+                range_pieces.append((len(fetches), start, end))
+                fetches.append((start, end, address))
+            start = end + 1
+        pieces.append(range_pieces)
+
+    # Missing finalized buckets are fetched whole and stored; the near-tip pieces go
+    # out in the same batches, after them (so their ids are shifted by 'offset')
+    missing = [key for key, logs in buckets.items() if logs is None]
+    offset = len(missing)
+    fetched = await _fetch_logs_batch(
+        [(bucket_start, bucket_end, key_address) for key_address, bucket_start, bucket_end in missing] + fetches
+    )
+    for fetch_id, key in enumerate(missing):
+        buckets[key] = fetched.pop(fetch_id)
+    if missing:
+        window_start = min(from_block for from_block, _, _ in ranges)
+        _cache_logs(db, [(key, buckets[key]) for key in missing], window_start - window_start % bucket_size)
+
+    results = {}
+    for request_id, range_pieces in enumerate(pieces):
+        logs = []
+        for source, start, end in range_pieces:
+            if not isinstance(source, tuple):
+                logs.extend(fetched[offset + source])
+            elif start == source[1] and end == source[2]:
+                logs.extend(buckets[source])
+            else:
+                logs.extend(log for log in buckets[source] if start <= int(log["blockNumber"], 16) <= end)
+        results[request_id] = logs
+    return results
+
+async def _fetch_logs_batch(ranges: list[tuple[int, int, str]]) -> dict[int, list]:
+    """
+    Retrieves Swap logs for many (from_block, to_block, address) ranges in a single JSON-RPC batch.
+
+    Instead of paying one HTTP round-trip per range (as with 'get_logs_in_range'),
+    every range is packed into one array of 'eth_getLogs' request objects and sent
+    in a single POST. Each request object gets a unique 'id' equal to its index in
+    'ranges', so the responses (which the node may return in any order) can be
+    matched back to the range that produced them.
+
+    Providers limit the number of 'eth_getLogs' calls per batch (Alchemy rejects the
+    whole batch with "Too many eth_getLogs methods in the batch"), so at most
+    S.MAX_LOGS_PER_BATCH ranges go in one POST; bigger inputs become several
+    sub-batches sent concurrently.
+
+    Ranges the provider rejects as too large, or that already exceed the pool's
+    learned block-range limit, are fetched through 'get_logs_adaptive' instead. A
+    rejection inside the batch already sets the pool's limit (from the provider's
+    suggested range), so those ranges are split right away rather than sent again
+    whole. Nothing is cached here; see 'get_logs_batch'.
+
+    API Endpoint:
+        - POST to S.ALCHEMY_URL with a JSON array of 'eth_getLogs' request objects
+          (one POST per S.MAX_LOGS_PER_BATCH ranges), e.g. [{"jsonrpc": "2.0", "id": 0, "method": "eth_getLogs", "params": [...]}, ...].
+
+    Parameters:
+        ranges (list[tuple[int, int, str]]): (from_block, to_block, address) tuples,
+                                             with block numbers inclusive.
+
+    Returns:
+        dict[int, list]: Maps each request id (the index into 'ranges') to its list
+                         of raw log entries.
+
+    Raises:
+        Exception: If the HTTP request fails, the batch itself is rejected, or any
+                   individual request in the batch returns an error.
+    """
+    if not ranges:
+        return {}
+
+    results = {}
+    adaptive_ids = []  # requests fetched through get_logs_adaptive instead
+    batch_ids = []
+    for request_id, (from_block, to_block, address) in enumerate(ranges):
+        # Ranges already known to be too large for their pool are split up front
+        max_range = _MAX_RANGE_HINTS.get(address.lower(), S.MAX_LOG_BLOCK_RANGE)
+        if max_range and to_block - from_block + 1 > max_range:
+            adaptive_ids.append(request_id)
+        else:
+            batch_ids.append(request_id)
+
+    # Providers cap how many eth_getLogs calls one batch may hold, so larger batches
+    # are split into S.MAX_LOGS_PER_BATCH-sized sub-batches that are posted concurrently
+    sub_batches = [batch_ids[i:i + S.MAX_LOGS_PER_BATCH] for i in range(0, len(batch_ids), S.MAX_LOGS_PER_BATCH)]
+    responses = await asyncio.gather(*(
+        post_rpc([
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "eth_getLogs",
+                "params": [_swap_logs_filter(*ranges[request_id])]
+            }
+            for request_id in sub_batch
+        ])
+        for sub_batch in sub_batches
+    ))
+
+    for data in responses:
+        if not isinstance(data, list):
+            # the whole batch was rejected (e.g. too many requests in one batch)
+            raise Exception(f"Error in get_logs_batch: {data}")
+
+        for item in data:
+            if "result" in item:
+                results[item["id"]] = item["result"]
+            elif "error" in item and is_range_error(error := RPCError(item["error"])):
+                # too large for the provider: learn the split from this rejection, so
+                # get_logs_adaptive splits right away instead of asking again
+                _record_range_hint(*ranges[item["id"]], error)
+                adaptive_ids.append(item["id"])
+            else:
+                raise Exception(f"Error in get_logs_batch for id {item.get('id')}: {item}")
+
+    if adaptive_ids:
+        adaptive_logs = await asyncio.gather(*(get_logs_adaptive(*ranges[i]) for i in adaptive_ids))
+        results.update(zip(adaptive_ids, adaptive_logs))
+
+    if len(results) != len(ranges):
+        raise Exception(f"get_logs_batch expected {len(ranges)} responses, got {len(results)}")
+
+    return results
+
+async def get_token0(pool_address: str) -> str:
     """
     Retrieves the address of 'token0' from a Uniswap V3 pool contract via Alchemy’s JSON-RPC.
 
@@ -122,12 +708,12 @@ def get_token0(pool_address: str) -> str:
             "latest"
         ]
     }
-    resp = requests.post(S.ALCHEMY_URL, headers=S.HEADERS, json=payload)
-    result_hex = resp.json().get("result")
+    data = await post_rpc(payload)
+    result_hex = data.get("result")
     # last 20 bytes is the token0 address
     return "0x" + result_hex[-40:].lower()
 
-def get_token1(pool_address: str) -> str:
+async def get_token1(pool_address: str) -> str:
     """
     Retrieves the address of 'token1' from a Uniswap V3 pool contract via Alchemy’s JSON-RPC.
 
@@ -163,18 +749,74 @@ def get_token1(pool_address: str) -> str:
             "latest"
         ]
     }
-    resp = requests.post(S.ALCHEMY_URL, headers=S.HEADERS, json=payload)
-    result_hex = resp.json().get("result")
+    data = await post_rpc(payload)
+    result_hex = data.get("result")
     return "0x" + result_hex[-40:].lower()
 
-def detect_if_alt_token_is_token0(pool_address: str, alt_token_address: str) -> bool:
+async def get_token0_and_token1(pool_address: str) -> tuple[str, str]:
+    """
+    Retrieves both 'token0' and 'token1' of a Uniswap V3 pool in a single JSON-RPC batch request.
+
+    Sends the same two 'eth_call's as 'get_token0()' and 'get_token1()', but as one
+    JSON array in one POST, so the pair costs a single HTTP round-trip.
+    A pool's tokens are immutable, so the answer is memoized per pool for the rest
+    of the process.
+
+    API Endpoint:
+        - POST to S.ALCHEMY_URL with a JSON array of two 'eth_call' request objects:
+          id 0 calls token0() (0x0dfe1681), id 1 calls token1() (0xd21220a7).
+
+    Parameters:
+        pool_address (str): The Uniswap V3 pool contract address.
+
+    Returns:
+        tuple[str, str]: The (token0, token1) addresses in lowercase 0x-prefixed hex.
+
+    Raises:
+        Exception: If the request fails, the batch is rejected, or either call returns an error.
+    """
+    pool_key = pool_address.lower()
+    if pool_key in _POOL_TOKENS:
+        return _POOL_TOKENS[pool_key]
+
+    payload = [
+        {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "eth_call",
+            "params": [
+                {
+                    "to": pool_address,
+                    "data": selector
+                },
+                "latest"
+            ]
+        }
+        for request_id, selector in enumerate(("0x0dfe1681", "0xd21220a7"))  # token0(), token1()
+    ]
+    data = await post_rpc(payload)
+    if not isinstance(data, list):
+        raise Exception(f"Error in get_token0_and_token1: {data}")
+
+    results = {item.get("id"): item.get("result") for item in data}
+    if results.get(0) is None or results.get(1) is None:
+        raise Exception(f"Error in get_token0_and_token1 for pool {pool_address}: {data}")
+    # last 20 bytes of each 32-byte word is the address
+    tokens = ("0x" + results[0][-40:].lower(), "0x" + results[1][-40:].lower())
+    _POOL_TOKENS[pool_key] = tokens
+    return tokens
+
+async def detect_if_alt_token_is_token0(pool_address: str, alt_token_address: str) -> bool:
     """
     Determines whether a given alt token address is 'token0' or 'token1' in a Uniswap V3 pool.
 
-    Internally, this function calls 'get_token0()' and 'get_token1()' on the pool and compares
-    those addresses with 'alt_token_address'. If 'alt_token_address' matches 'token0', it returns True;
+    Internally, this function reads the pool's token0 and token1 in one batched request
+    ('get_token0_and_token1()') and compares those addresses with 'alt_token_address'. If 'alt_token_address' matches 'token0', it returns True;
     if it matches 'token1', it returns False. Otherwise, it raises an exception indicating a mismatch.
 
+    Token ordering never changes for a deployed pool, so answers are persisted to
+    S.TOKEN_ORDER_CACHE_FILE. A cached pool costs zero RPC calls on later runs.
+
     Parameters:
         pool_address (str): The Uniswap V3 pool contract address.
         alt_token_address (str): The alt token address to check (e.g., BNKR or ACT).
@@ -187,18 +829,50 @@ def detect_if_alt_token_is_token0(pool_address: str, alt_token_address: str) ->
     Raises:
         Exception: If the alt token address does not match either 'token0' or 'token1'.
     """
-    t0 = get_token0(pool_address)
-    t1 = get_token1(pool_address)
+    cache = _load_token_order_cache()
+    cache_key = f"{pool_address.lower()}:{alt_token_address.lower()}"
+    if cache_key in cache:
+        return cache[cache_key]
+
+    t0, t1 = await get_token0_and_token1(pool_address)
 
     if alt_token_address.lower() == t0.lower():
-        return True
+        is_token0 = True
     elif alt_token_address.lower() == t1.lower():
-        return False
+        is_token0 = False
     else:
         raise Exception(
             f"Pool {pool_address} does not have {alt_token_address} as token0 or token1.\n"
             f"Found token0={t0}, token1={t1} instead."
         )
+
+    cache[cache_key] = is_token0
+    _save_token_order_cache(cache)
+    return is_token0
+
+def _load_token_order_cache() -> dict[str, bool]:
+    """
+    Returns the in-memory token order cache, reading S.TOKEN_ORDER_CACHE_FILE the first time.
+    A missing or unreadable file just means an empty cache.
+    """
+    global _TOKEN_ORDER_CACHE
+    if _TOKEN_ORDER_CACHE is None:
+        try:
+            with open(S.TOKEN_ORDER_CACHE_FILE, "rb") as f:
+                _TOKEN_ORDER_CACHE = orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            _TOKEN_ORDER_CACHE = {}
+    return _TOKEN_ORDER_CACHE
+
+def _save_token_order_cache(cache: dict[str, bool]) -> None:
+    """
+    Writes the token order cache to S.TOKEN_ORDER_CACHE_FILE (via a temp file, so a
+    crash mid-write never leaves a truncated cache behind).
+    """
+    tmp_path = S.TOKEN_ORDER_CACHE_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+    os.replace(tmp_path, S.TOKEN_ORDER_CACHE_FILE)
     
 def compute_price_in_quote_token(sqrt_price_x96: int, alt_token_is_token0: bool) -> float:
     """
@@ -207,6 +881,7 @@ def compute_price_in_quote_token(sqrt_price_x96: int, alt_token_is_token0: bool)
     Uniswap V3 represents its price as the square root of (token1 / token0), scaled by 2^96.
     If the alt token is token0, then (sqrtPriceX96^2 / 2^192) yields “quoteToken per altToken.”
     If the alt token is token1, we invert that value to get “quoteToken per altToken.”
+    The math is done in float64, so results carry double rounding (relative error < 1e-15).
     
     Parameters:
         sqrt_price_x96 (int): The 160-bit sqrt(price) value from a Swap event log.
@@ -222,8 +897,11 @@ def compute_price_in_quote_token(sqrt_price_x96: int, alt_token_is_token0: bool)
     Raises:
         ValueError: If sqrt_price_x96 is invalid or outside typical Uniswap V3 ranges.
     """
-    # raw_price = token1/token0
-    raw_price = (sqrt_price_x96 ** 2) / (2 ** 192)
+    # raw_price = token1/token0 = (sqrtPriceX96 / 2^96)^2. Converting to float once and
+    # scaling by the 2^-96 constant avoids a ~320-bit bigint square and division (and a
+    # math.ldexp call); sqrtPriceX96 < 2^160, so nothing can overflow a float.
+    sqrt_price = float(sqrt_price_x96) * _INV_2_96
+    raw_price = sqrt_price * sqrt_price
 
     if alt_token_is_token0:
         # raw_price is WETH per alt token => that's good if token1 = WETH
@@ -275,31 +953,31 @@ def process_swap_log(log: dict, alt_token_is_token0: bool) -> dict | None:
         ValueError: If the log’s data cannot be decoded properly or contains invalid values.
         KeyError:   If the expected 'topics' or 'data' fields are missing in the log.
     """
-    topics = log.get("topics", [])
-    if not topics or topics[0].lower() != S.SWAP_TOPIC.lower():
+    # get_logs_in_range already filters on S.SWAP_TOPIC server-side; this guard only
+    # matters for logs fetched some other way
+    # no default: log.get("topics", []) would build a fresh list on every call
+    topics = log.get("topics")
+    if not topics or topics[0] not in _SWAP_TOPIC0:
         return None  # not a Swap event
 
     # Decode Swap event data:
     # Swap(address sender, address recipient, int256 amount0, int256 amount1,
     #      uint160 sqrtPriceX96, uint128 liquidity, int24 tick)
     #
-    # Our decode signature with eth_abi:
-    #   (int256 amount0, int256 amount1, uint160 sqrtPriceX96, uint128 liquidity, int256 tick)
-    decoded = abi.decode(
-        ["int256", "int256", "uint160", "uint128", "int256"],
-        bytes.fromhex(log["data"][2:])
-    )
-    amount0        = decoded[0]
-    amount1        = decoded[1]
-    sqrt_price_x96 = decoded[2]
-    # liquidity    = decoded[3]  # not needed at the moment
-    # tick_raw     = decoded[4]
+    # The data section holds the five non-indexed fields as static 32-byte words:
+    #   (int256 amount0, int256 amount1, uint160 sqrtPriceX96, uint128 liquidity, int24 tick)
+    # so each field is sliced out directly instead of going through a generic ABI decoder.
+    # Only the first three words are needed, so only their 192 hex chars are decoded.
+    data = binascii.unhexlify(log["data"][2:194])
+    if len(data) < 96:
+        raise ValueError(f"Swap log data too short ({len(data)} bytes): {log['data']}")
+    amount0        = int.from_bytes(data[0:32], "big", signed=True)
+    amount1        = int.from_bytes(data[32:64], "big", signed=True)
+    sqrt_price_x96 = int.from_bytes(data[64:96], "big")  # uint160, upper bytes are zero
+    # liquidity (word 3) and tick (word 4) are not needed at the moment
 
     # Determine buy vs sell (if token is token0, a positive amount0 means a buy)
-    if alt_token_is_token0:
-        trade_type = "buy" if amount0 > 0 else "sell"
-    else:
-        trade_type = "buy" if amount1 > 0 else "sell"
+    trade_type = _BUY_SELL[(amount0 if alt_token_is_token0 else amount1) > 0]
 
     # Calculate price (token1 per token0) from sqrtPriceX96
     price_in_quote = compute_price_in_quote_token(sqrt_price_x96, alt_token_is_token0)
@@ -313,8 +991,69 @@ def process_swap_log(log: dict, alt_token_is_token0: bool) -> dict | None:
         "trade_type": trade_type
     }
 
+def process_swap_logs_batch(logs: list, alt_token_is_token0: bool) -> dict[str, list | np.ndarray]:
+    """
+    Decodes a whole list of Swap logs at once; the vectorized equivalent of 'process_swap_log'.
+
+    The first three words (amount0, amount1, sqrtPriceX96) of every log's data section
+    are hex-decoded into one contiguous buffer and viewed as an (N, 12) array of
+    big-endian 64-bit limbs; liquidity and tick are never touched. From that array,
+    NumPy computes for every row in one pass:
+        - trade_type, from the sign bit (top bit of the high limb) and a non-zero check
+          of the relevant amount word, without building the amount as a Python int.
+        - price, by folding the three low limbs of sqrtPriceX96 (a uint160) into a
+          float64 scaled by 2^-96 and squaring, inverting when the alt token is token1.
+    Only amount0/amount1 are still converted to exact Python ints, since int256 values
+    do not fit a NumPy dtype.
 
+    The result is returned column-wise rather than as one dict per swap, so callers
+    (SwapFileWriter, the per-hour summary) work on whole columns and no per-row
+    objects are built. trade_type is carried as the boolean is_buy array; the
+    writer turns it into text or categorical codes.
 
+    Parameters:
+        logs (list): Raw log entries as returned by 'get_logs_in_range'.
+        alt_token_is_token0 (bool): Indicates whether the alt token is token0 in the pool.
 
+    Returns:
+        dict[str, list | np.ndarray]: Equal-length columns, one entry per Swap log in
+                                      input order (logs that are not Swap events are skipped):
+            "tx_hash"    (list[str]):  Transaction hash of each swap.
+            "amount0"    (list[int]):  Signed amount of token0 swapped.
+            "amount1"    (list[int]):  Signed amount of token1 swapped.
+            "price"      (np.ndarray): float64 alt token price in the quote token.
+            "is_buy"     (np.ndarray): bool array, True for a "buy", False for a "sell".
 
+    Raises:
+        ValueError: If a Swap log's data is shorter than three 32-byte words.
+        KeyError:   If the expected 'topics' or 'data' fields are missing in a log.
+    """
+    swap_logs = [log for log in logs if (topics := log.get("topics")) and topics[0] in _SWAP_TOPIC0]
+    n = len(swap_logs)
 
+    # One hex decode for the whole chunk rather than one per log, 96 bytes per log.
+    # Slicing off "0x" and the unused words before joining is cheaper than decoding
+    # whole payloads; join() gets a list because it would build one from a generator anyway
+    buf = binascii.unhexlify("".join([log["data"][2:194] for log in swap_logs]))
+    if len(buf) != n * 96:
+        raise ValueError(f"Expected {n} Swap payloads of at least 96 bytes, got {len(buf)} bytes in total")
+    limbs = np.frombuffer(buf, dtype=">u8").reshape(n, 12)
+
+    # word 0 = amount0 (limbs 0-3), word 1 = amount1 (limbs 4-7); a positive alt amount is a buy
+    first_limb = 0 if alt_token_is_token0 else 4
+    alt_amount = limbs[:, first_limb:first_limb + 4]
+    is_buy = ((alt_amount[:, 0] >> 63) == 0) & alt_amount.any(axis=1)
+
+    # word 2 = sqrtPriceX96 (limbs 8-11); a uint160 only uses limb 11, 10 and the low half of 9
+    sqrt_price = (limbs[:, 9].astype(np.float64) * 2.0 ** 32
+                  + limbs[:, 10].astype(np.float64) * 2.0 ** -32
+                  + limbs[:, 11].astype(np.float64) * _INV_2_96)
+    raw_price = sqrt_price * sqrt_price  # token1 per token0
+
+    return {
+        "tx_hash": [log.get("transactionHash") for log in swap_logs],
+        "amount0": [int.from_bytes(buf[i:i + 32], "big", signed=True) for i in range(0, n * 96, 96)],
+        "amount1": [int.from_bytes(buf[i + 32:i + 64], "big", signed=True) for i in range(0, n * 96, 96)],
+        "price": raw_price if alt_token_is_token0 else 1 / raw_price,
+        "is_buy": is_buy
+    }